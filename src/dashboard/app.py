@@ -5,14 +5,20 @@ Streamlit dashboard for exploring education statistics
 """
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
+from plotly_resampler import FigureResampler
 import sqlite3
 from datetime import datetime
 import yaml
 import os
 
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
 # Page configuration
 st.set_page_config(
     page_title="OECD Education Data Dashboard",
@@ -23,7 +29,14 @@ st.set_page_config(
 
 # Load configuration
 with open("config.yaml", 'r') as f:
-    config = yaml.safe_load(f)
+    config = yaml.load(f, Loader=_SafeLoader)
+
+# Shared Plotly layout defaults, layered on the standard plotly template
+pio.templates['edu'] = go.layout.Template(layout=dict(
+    height=500,
+    margin=dict(l=40, r=40, t=60, b=40)
+))
+pio.templates.default = 'plotly+edu'
 
 # Custom CSS
 st.markdown("""
@@ -49,6 +62,38 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def _get_conn(db_path):
+    """Open a single shared SQLite connection for all sessions and reruns"""
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn
+
+def _compact(df):
+    """Downcast numeric columns and categorize country columns to shrink the DataFrame"""
+    for col in df.select_dtypes('float').columns:
+        df[col] = pd.to_numeric(df[col], downcast='float')
+    for col in df.select_dtypes('integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in ['country_code', 'country_name']:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+@st.cache_data(ttl=3600)
+def _query(db_path, sql, params=()):
+    """Execute SQL query against the database and cache the resulting DataFrame"""
+    return _compact(pd.read_sql_query(sql, _get_conn(db_path), params=params))
+
+@st.cache_data
+def _pivot_trends(trends_df):
+    """Reshape enrollment trends into a year x country table"""
+    return trends_df.pivot(index='year', columns='country_name', values='avg_enrollment').round(2)
+
 class EducationDashboard:
     """Education data dashboard"""
     
@@ -59,37 +104,33 @@ class EducationDashboard:
     def connect(self):
         """Connect to SQLite database"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = _get_conn(self.db_path)
             return True
         except Exception as e:
             st.error(f"Error connecting to database: {e}")
             return False
     
-    def query_data(self, query):
+    def query_data(self, query, params=()):
         """Execute SQL query and return DataFrame"""
         try:
-            df = pd.read_sql_query(query, self.conn)
-            return df
+            return _query(self.db_path, query, tuple(params))
         except Exception as e:
             st.error(f"Error executing query: {e}")
             return pd.DataFrame()
     
     def get_database_stats(self):
         """Get statistics about the database"""
-        stats = {}
-        
         tables = ['enrollment_data', 'graduation_data', 
                   'education_spending', 'country_metadata']
         
-        for table in tables:
-            try:
-                query = f"SELECT COUNT(*) as count FROM {table}"
-                df = self.query_data(query)
-                stats[table] = df['count'].iloc[0]
-            except:
-                stats[table] = 0
+        query = "SELECT " + ", ".join(
+            f"(SELECT COUNT(*) FROM {table}) AS {table}" for table in tables
+        )
+        df = self.query_data(query)
+        if df.empty:
+            return {table: 0 for table in tables}
         
-        return stats
+        return df.iloc[0].to_dict()
     
     def get_country_list(self):
         """Get list of countries in the database"""
@@ -102,92 +143,360 @@ class EducationDashboard:
     
     def get_enrollment_trends(self, country_codes=None):
         """Get enrollment trends for selected countries"""
-        if country_codes:
-            country_filter = f"WHERE country_code IN ({','.join(['?']*len(country_codes))})"
-            params = country_codes
-        else:
-            country_filter = ""
-            params = []
+        if not country_codes:
+            return pd.DataFrame(columns=['year', 'country_code', 'country_name',
+                                         'avg_enrollment', 'data_points'])
+        
+        placeholders = ','.join('?' * len(country_codes))
         
         query = f"""
         SELECT 
             year,
             country_code,
             country_name,
-            AVG(enrollment_rate) as avg_enrollment,
-            COUNT(*) as data_points
-        FROM enrollment_data
-        {country_filter}
-        GROUP BY year, country_code, country_name
+            avg_enrollment,
+            data_points
+        FROM enrollment_yearly_country
+        WHERE country_code IN ({placeholders})
         ORDER BY year, country_code
         """
         
-        df = self.query_data(query)
-        if not df.empty and params:
-            df = df[df['country_code'].isin(params)]
+        return self.query_data(query, tuple(country_codes))
+    
+    def get_country_codes(self, country_names):
+        """Get country codes for the given country names"""
+        if not country_names:
+            return []
         
-        return df
+        query = f"""
+        SELECT country_code
+        FROM country_metadata
+        WHERE country_name IN ({','.join(['?']*len(country_names))})
+        """
+        df = self.query_data(query, country_names)
+        return df['country_code'].tolist() if not df.empty else []
     
     def get_graduation_rates(self, year=2022):
         """Get graduation rates for a specific year"""
-        query = f"""
+        query = """
         SELECT 
             country_code,
             country_name,
             graduation_rate,
             completion_rate
         FROM graduation_data
-        WHERE year = {year}
+        WHERE year = ?
         ORDER BY graduation_rate DESC
         LIMIT 20
         """
-        return self.query_data(query)
+        return self.query_data(query, (year,))
     
     def get_spending_comparison(self, year=2022):
         """Get education spending comparison"""
-        query = f"""
+        query = """
         SELECT 
             country_code,
             country_name,
             spending_usd,
             spending_per_capita
         FROM education_spending
-        WHERE year = {year}
+        WHERE year = ?
         AND spending_usd IS NOT NULL
         ORDER BY spending_usd DESC
         LIMIT 15
         """
-        return self.query_data(query)
+        return self.query_data(query, (year,))
     
     def get_education_indicators(self, country_code):
         """Get all education indicators for a specific country"""
-        queries = {
-            'enrollment': f"""
-                SELECT year, enrollment_rate 
-                FROM enrollment_data 
-                WHERE country_code = '{country_code}'
-                ORDER BY year
-            """,
-            'graduation': f"""
-                SELECT year, graduation_rate 
-                FROM graduation_data 
-                WHERE country_code = '{country_code}'
-                ORDER BY year
-            """,
-            'spending': f"""
-                SELECT year, spending_usd 
-                FROM education_spending 
-                WHERE country_code = '{country_code}'
-                ORDER BY year
-            """
+        columns = {
+            'enrollment': 'enrollment_rate',
+            'graduation': 'graduation_rate',
+            'spending': 'spending_usd'
         }
         
+        query = """
+        SELECT 'enrollment' AS kind, year, enrollment_rate AS value
+        FROM enrollment_data 
+        WHERE country_code = ?
+        UNION ALL
+        SELECT 'graduation', year, graduation_rate 
+        FROM graduation_data 
+        WHERE country_code = ?
+        UNION ALL
+        SELECT 'spending', year, spending_usd 
+        FROM education_spending 
+        WHERE country_code = ?
+        ORDER BY kind, year
+        """
+        df = self.query_data(query, (country_code,) * len(columns))
+        
         results = {}
-        for key, query in queries.items():
-            results[key] = self.query_data(query)
+        for key, column in columns.items():
+            if df.empty:
+                results[key] = pd.DataFrame(columns=['year', column])
+            else:
+                results[key] = (df.loc[df['kind'] == key, ['year', 'value']]
+                                .rename(columns={'value': column})
+                                .reset_index(drop=True))
         
         return results
 
+@st.fragment
+def render_trends(dashboard, selected_countries):
+    """Render the enrollment trends tab"""
+    st.header("Enrollment Rate Trends")
+    
+    if selected_countries:
+        # Get country codes for selected countries
+        country_codes = dashboard.get_country_codes(selected_countries)
+        
+        # Get enrollment trends
+        trends_df = dashboard.get_enrollment_trends(country_codes)
+        
+        if not trends_df.empty:
+            # Line chart (LTTB-downsampled server-side for long series)
+            fig = FigureResampler(go.Figure(), default_n_shown_samples=2000)
+            
+            for country, country_df in trends_df.groupby('country_name', observed=True, sort=False):
+                fig.add_trace(
+                    go.Scattergl(mode='lines+markers', name=country),
+                    hf_x=country_df['year'].to_numpy(),
+                    hf_y=country_df['avg_enrollment'].to_numpy()
+                )
+            
+            fig.update_layout(
+                title='Enrollment Rate Trends (2000-2023)',
+                xaxis_title='Year',
+                yaxis_title='Average Enrollment Rate (%)',
+                hovermode='x unified',
+                yaxis_range=[0, 120]
+            )
+            
+            st.plotly_chart(fig, use_container_width=True)
+            
+            # Data table
+            with st.expander("View Data Table"):
+                st.dataframe(_pivot_trends(trends_df))
+        else:
+            st.info("No enrollment data available for selected countries")
+    else:
+        st.info("Please select countries from the sidebar")
+
+@st.fragment
+def render_graduation(dashboard, selected_year):
+    """Render the graduation rates tab"""
+    st.header(f"Graduation Rates ({selected_year})")
+    
+    # Get graduation rates
+    grad_df = dashboard.get_graduation_rates(selected_year)
+    
+    if not grad_df.empty:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Bar chart
+            top10 = grad_df.head(10)
+            fig = go.Figure(go.Bar(
+                x=top10['graduation_rate'].to_numpy(),
+                y=top10['country_name'].to_numpy(),
+                orientation='h',
+                marker=dict(
+                    color=top10['graduation_rate'].to_numpy(),
+                    colorscale='Viridis',
+                    showscale=True,
+                    colorbar=dict(title='Graduation Rate (%)')
+                )
+            ))
+            
+            fig.update_layout(
+                title='Top 10 Countries by Graduation Rate',
+                xaxis_title='Graduation Rate (%)',
+                yaxis_title='Country',
+                height=400
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            # Completion rate scatter (marker area scaled to graduation rate)
+            fig = go.Figure()
+            sizeref = 2.0 * grad_df['graduation_rate'].max() / (20 ** 2)
+            
+            for country, country_df in grad_df.groupby('country_name', observed=True, sort=False):
+                fig.add_trace(go.Scattergl(
+                    x=country_df['graduation_rate'].to_numpy(),
+                    y=country_df['completion_rate'].to_numpy(),
+                    mode='markers',
+                    name=country,
+                    hovertext=[country] * len(country_df),
+                    marker=dict(
+                        size=country_df['graduation_rate'].to_numpy(),
+                        sizemode='area',
+                        sizeref=sizeref
+                    )
+                ))
+            
+            fig.update_layout(
+                title='Graduation vs Completion Rates',
+                xaxis_title='Graduation Rate (%)',
+                yaxis_title='Completion Rate',
+                height=400
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        
+        # Data table
+        with st.expander("View Full Data Table"):
+            st.dataframe(grad_df[['country_name', 'graduation_rate', 'completion_rate']])
+    else:
+        st.info(f"No graduation data available for {selected_year}")
+
+@st.fragment
+def render_spending(dashboard, selected_year):
+    """Render the education spending tab"""
+    st.header(f"Education Spending ({selected_year})")
+    
+    # Get spending data
+    spending_df = dashboard.get_spending_comparison(selected_year)
+    
+    if not spending_df.empty:
+        top10 = spending_df.head(10)
+        
+        # Create subplots
+        fig = make_subplots(
+            rows=1, cols=2,
+            subplot_titles=('Total Education Spending', 'Spending per Capita'),
+            specs=[[{'type': 'bar'}, {'type': 'bar'}]]
+        )
+        
+        # Total spending
+        fig.add_trace(
+            go.Bar(
+                x=top10['country_name'],
+                y=top10['spending_usd'],
+                name='Total Spending (USD)',
+                marker_color='#2E86AB'
+            ),
+            row=1, col=1
+        )
+        
+        # Per capita spending
+        fig.add_trace(
+            go.Bar(
+                x=top10['country_name'],
+                y=top10['spending_per_capita'],
+                name='Per Capita (USD)',
+                marker_color='#F18F01'
+            ),
+            row=1, col=2
+        )
+        
+        fig.update_layout(
+            showlegend=True,
+            title_text=f"Education Spending Comparison - {selected_year}"
+        )
+        
+        fig.update_xaxes(tickangle=45)
+        
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Spending metrics
+        spending = spending_df['spending_usd'].agg(['mean', 'max', 'idxmax', 'min', 'idxmin'])
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Average Spending", f"${spending['mean']:,.0f}")
+        
+        with col2:
+            max_country = spending_df.loc[spending['idxmax'], 'country_name']
+            st.metric("Highest Spending", f"${spending['max']:,.0f}", f"{max_country}")
+        
+        with col3:
+            min_country = spending_df.loc[spending['idxmin'], 'country_name']
+            st.metric("Lowest Spending", f"${spending['min']:,.0f}", f"{min_country}")
+        
+    else:
+        st.info(f"No spending data available for {selected_year}")
+
+@st.fragment
+def render_profile(dashboard, selected_countries, countries_df):
+    """Render the country profile tab"""
+    st.header("Country Education Profile")
+    
+    if selected_countries:
+        selected_country = selected_countries[0]
+        country_code = countries_df[
+            countries_df['country_name'] == selected_country
+        ]['country_code'].iloc[0]
+        
+        # Get all indicators for selected country
+        indicators = dashboard.get_education_indicators(country_code)
+        
+        st.subheader(f"Education Profile: {selected_country}")
+        
+        # Create metrics row
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            if not indicators['enrollment'].empty:
+                latest_enrollment = indicators['enrollment']['enrollment_rate'].iloc[-1]
+                st.metric("Latest Enrollment Rate", f"{latest_enrollment:.1f}%")
+        
+        with col2:
+            if not indicators['graduation'].empty:
+                latest_graduation = indicators['graduation']['graduation_rate'].iloc[-1]
+                st.metric("Latest Graduation Rate", f"{latest_graduation:.1f}%")
+        
+        with col3:
+            if not indicators['spending'].empty:
+                latest_spending = indicators['spending']['spending_usd'].iloc[-1]
+                st.metric("Latest Spending", f"${latest_spending:,.0f}")
+        
+        with col4:
+            if not indicators['enrollment'].empty:
+                enrollment_trend = indicators['enrollment']['enrollment_rate'].pct_change().iloc[-1] * 100
+                st.metric("Enrollment Trend", f"{enrollment_trend:+.1f}%")
+        
+        # Create time series chart (LTTB-downsampled server-side for long series)
+        fig = FigureResampler(go.Figure(), default_n_shown_samples=2000)
+        
+        if not indicators['enrollment'].empty:
+            fig.add_trace(
+                go.Scattergl(mode='lines+markers', name='Enrollment Rate', yaxis='y1'),
+                hf_x=indicators['enrollment']['year'].to_numpy(),
+                hf_y=indicators['enrollment']['enrollment_rate'].to_numpy()
+            )
+        
+        if not indicators['graduation'].empty:
+            fig.add_trace(
+                go.Scattergl(mode='lines+markers', name='Graduation Rate', yaxis='y1'),
+                hf_x=indicators['graduation']['year'].to_numpy(),
+                hf_y=indicators['graduation']['graduation_rate'].to_numpy()
+            )
+        
+        if not indicators['spending'].empty:
+            # Add secondary axis for spending
+            fig.add_trace(
+                go.Scattergl(mode='lines+markers', name='Spending (USD)', yaxis='y2'),
+                hf_x=indicators['spending']['year'].to_numpy(),
+                hf_y=indicators['spending']['spending_usd'].to_numpy()
+            )
+        
+        fig.update_layout(
+            title=f"Education Indicators Over Time - {selected_country}",
+            hovermode='x unified',
+            yaxis=dict(title="Rate (%)"),
+            yaxis2=dict(
+                title="Spending (USD)",
+                overlaying='y',
+                side='right'
+            )
+        )
+        
+        st.plotly_chart(fig, use_container_width=True)
+        
+    else:
+        st.info("Please select a country from the sidebar")
+
 def main():
     """Main dashboard function"""
     st.markdown('<h1 class="main-header">🎓 OECD Education Data Dashboard</h1>', 
@@ -205,6 +514,8 @@ def main():
     with st.sidebar:
         st.header("📊 Dashboard Controls")
         
+        countries_df = dashboard.get_country_list()
+        
         # Data source info
         st.markdown("### Data Source")
         st.markdown("""
@@ -225,7 +536,7 @@ def main():
         
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("Countries", len(dashboard.get_country_list()))
+            st.metric("Countries", len(countries_df))
             st.metric("Enrollment Records", stats.get('enrollment_data', 0))
         
         with col2:
@@ -234,7 +545,6 @@ def main():
         
         # Country selection
         st.markdown("### Country Selection")
-        countries_df = dashboard.get_country_list()
         selected_countries = st.multiselect(
             "Select Countries",
             options=countries_df['country_name'].tolist(),
@@ -255,248 +565,16 @@ def main():
     tab1, tab2, tab3, tab4 = st.tabs(["📈 Trends", "🎓 Graduation", "💰 Spending", "🌍 Country Profile"])
     
     with tab1:
-        st.header("Enrollment Rate Trends")
-        
-        if selected_countries:
-            # Get country codes for selected countries
-            country_codes = countries_df[
-                countries_df['country_name'].isin(selected_countries)
-            ]['country_code'].tolist()
-            
-            # Get enrollment trends
-            trends_df = dashboard.get_enrollment_trends(country_codes)
-            
-            if not trends_df.empty:
-                # Line chart
-                fig = px.line(
-                    trends_df,
-                    x='year',
-                    y='avg_enrollment',
-                    color='country_name',
-                    title='Enrollment Rate Trends (2000-2023)',
-                    labels={'avg_enrollment': 'Average Enrollment Rate (%)', 'year': 'Year'},
-                    markers=True
-                )
-                
-                fig.update_layout(
-                    height=500,
-                    hovermode='x unified',
-                    yaxis_range=[0, 120]
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Data table
-                with st.expander("View Data Table"):
-                    st.dataframe(trends_df.pivot_table(
-                        index='year',
-                        columns='country_name',
-                        values='avg_enrollment'
-                    ).round(2))
-            else:
-                st.info("No enrollment data available for selected countries")
-        else:
-            st.info("Please select countries from the sidebar")
+        render_trends(dashboard, selected_countries)
     
     with tab2:
-        st.header(f"Graduation Rates ({selected_year})")
-        
-        # Get graduation rates
-        grad_df = dashboard.get_graduation_rates(selected_year)
-        
-        if not grad_df.empty:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Bar chart
-                fig = px.bar(
-                    grad_df.head(10),
-                    x='graduation_rate',
-                    y='country_name',
-                    orientation='h',
-                    title='Top 10 Countries by Graduation Rate',
-                    labels={'graduation_rate': 'Graduation Rate (%)', 'country_name': 'Country'},
-                    color='graduation_rate',
-                    color_continuous_scale='Viridis'
-                )
-                
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
-            
-            with col2:
-                # Completion rate scatter
-                fig = px.scatter(
-                    grad_df,
-                    x='graduation_rate',
-                    y='completion_rate',
-                    size='graduation_rate',
-                    color='country_name',
-                    title='Graduation vs Completion Rates',
-                    labels={
-                        'graduation_rate': 'Graduation Rate (%)',
-                        'completion_rate': 'Completion Rate'
-                    },
-                    hover_name='country_name'
-                )
-                
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # Data table
-            with st.expander("View Full Data Table"):
-                st.dataframe(grad_df[['country_name', 'graduation_rate', 'completion_rate']])
-        else:
-            st.info(f"No graduation data available for {selected_year}")
+        render_graduation(dashboard, selected_year)
     
     with tab3:
-        st.header(f"Education Spending ({selected_year})")
-        
-        # Get spending data
-        spending_df = dashboard.get_spending_comparison(selected_year)
-        
-        if not spending_df.empty:
-            # Create subplots
-            fig = make_subplots(
-                rows=1, cols=2,
-                subplot_titles=('Total Education Spending', 'Spending per Capita'),
-                specs=[[{'type': 'bar'}, {'type': 'bar'}]]
-            )
-            
-            # Total spending
-            fig.add_trace(
-                go.Bar(
-                    x=spending_df['country_name'].head(10),
-                    y=spending_df['spending_usd'].head(10),
-                    name='Total Spending (USD)',
-                    marker_color='#2E86AB'
-                ),
-                row=1, col=1
-            )
-            
-            # Per capita spending
-            fig.add_trace(
-                go.Bar(
-                    x=spending_df['country_name'].head(10),
-                    y=spending_df['spending_per_capita'].head(10),
-                    name='Per Capita (USD)',
-                    marker_color='#F18F01'
-                ),
-                row=1, col=2
-            )
-            
-            fig.update_layout(
-                height=500,
-                showlegend=True,
-                title_text=f"Education Spending Comparison - {selected_year}"
-            )
-            
-            fig.update_xaxes(tickangle=45)
-            
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Spending metrics
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                avg_spending = spending_df['spending_usd'].mean()
-                st.metric("Average Spending", f"${avg_spending:,.0f}")
-            
-            with col2:
-                max_spending = spending_df['spending_usd'].max()
-                max_country = spending_df.loc[spending_df['spending_usd'].idxmax(), 'country_name']
-                st.metric("Highest Spending", f"${max_spending:,.0f}", f"{max_country}")
-            
-            with col3:
-                min_spending = spending_df['spending_usd'].min()
-                min_country = spending_df.loc[spending_df['spending_usd'].idxmin(), 'country_name']
-                st.metric("Lowest Spending", f"${min_spending:,.0f}", f"{min_country}")
-            
-        else:
-            st.info(f"No spending data available for {selected_year}")
+        render_spending(dashboard, selected_year)
     
     with tab4:
-        st.header("Country Education Profile")
-        
-        if selected_countries:
-            selected_country = selected_countries[0]
-            country_code = countries_df[
-                countries_df['country_name'] == selected_country
-            ]['country_code'].iloc[0]
-            
-            # Get all indicators for selected country
-            indicators = dashboard.get_education_indicators(country_code)
-            
-            st.subheader(f"Education Profile: {selected_country}")
-            
-            # Create metrics row
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                if not indicators['enrollment'].empty:
-                    latest_enrollment = indicators['enrollment']['enrollment_rate'].iloc[-1]
-                    st.metric("Latest Enrollment Rate", f"{latest_enrollment:.1f}%")
-            
-            with col2:
-                if not indicators['graduation'].empty:
-                    latest_graduation = indicators['graduation']['graduation_rate'].iloc[-1]
-                    st.metric("Latest Graduation Rate", f"{latest_graduation:.1f}%")
-            
-            with col3:
-                if not indicators['spending'].empty:
-                    latest_spending = indicators['spending']['spending_usd'].iloc[-1]
-                    st.metric("Latest Spending", f"${latest_spending:,.0f}")
-            
-            with col4:
-                if not indicators['enrollment'].empty:
-                    enrollment_trend = indicators['enrollment']['enrollment_rate'].pct_change().iloc[-1] * 100
-                    st.metric("Enrollment Trend", f"{enrollment_trend:+.1f}%")
-            
-            # Create time series chart
-            fig = go.Figure()
-            
-            if not indicators['enrollment'].empty:
-                fig.add_trace(go.Scatter(
-                    x=indicators['enrollment']['year'],
-                    y=indicators['enrollment']['enrollment_rate'],
-                    mode='lines+markers',
-                    name='Enrollment Rate',
-                    yaxis='y1'
-                ))
-            
-            if not indicators['graduation'].empty:
-                fig.add_trace(go.Scatter(
-                    x=indicators['graduation']['year'],
-                    y=indicators['graduation']['graduation_rate'],
-                    mode='lines+markers',
-                    name='Graduation Rate',
-                    yaxis='y1'
-                ))
-            
-            if not indicators['spending'].empty:
-                # Add secondary axis for spending
-                fig.add_trace(go.Scatter(
-                    x=indicators['spending']['year'],
-                    y=indicators['spending']['spending_usd'],
-                    mode='lines+markers',
-                    name='Spending (USD)',
-                    yaxis='y2'
-                ))
-            
-            fig.update_layout(
-                title=f"Education Indicators Over Time - {selected_country}",
-                height=500,
-                hovermode='x unified',
-                yaxis=dict(title="Rate (%)"),
-                yaxis2=dict(
-                    title="Spending (USD)",
-                    overlaying='y',
-                    side='right'
-                )
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
-            
-        else:
-            st.info("Please select a country from the sidebar")
+        render_profile(dashboard, selected_countries, countries_df)
     
     # Footer
     st.markdown("---")
@@ -4,13 +4,23 @@ OECD Education Data Extractor
 Extracts education statistics from OECD API
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
-import json
+import numpy as np
+from numba import njit
+import orjson
 from datetime import datetime
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import yaml
+import ijson
+
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
 
 # Configure logging
 logging.basicConfig(
@@ -19,16 +29,62 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@njit(cache=True)
+def _parse_obs_keys(buf: np.ndarray, offsets: np.ndarray, out: np.ndarray):
+    """
+    Parse colon-separated observation keys into an index matrix
+    
+    Args:
+        buf: ASCII bytes of all observation keys concatenated, as uint8
+        offsets: Start offset of each key in buf, plus the end offset
+        out: Preallocated (n_obs, n_dims) int32 matrix to fill; entries for
+            dimensions missing from a key are left untouched
+    """
+    n_dims = out.shape[1]
+    for i in range(out.shape[0]):
+        j = 0
+        acc = 0
+        for pos in range(offsets[i], offsets[i + 1]):
+            c = buf[pos]
+            if c == 58:  # ':'
+                if j < n_dims:
+                    out[i, j] = acc
+                j += 1
+                acc = 0
+            else:
+                acc = acc * 10 + (c - 48)
+        if j < n_dims:
+            out[i, j] = acc
+
 class OECDDataExtractor:
     """Extracts education data from OECD API"""
     
     def __init__(self, config_path: str = "config.yaml"):
         with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+            self.config = yaml.load(f, Loader=_SafeLoader)
         
         self.base_url = self.config['data_sources']['oecd_stats']['url']
         self.datasets = self.config['data_sources']['oecd_stats']['datasets']
         
+        pipeline_config = self.config.get('pipeline', {})
+        self.timeout = pipeline_config.get('extraction_timeout', 30)
+        self.file_format = pipeline_config.get('file_format', 'parquet')
+        
+        # Pooled keep-alive session; retries with backoff replace fixed sleeps
+        retry = Retry(
+            total=pipeline_config.get('retry_attempts', 3),
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504]
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Accept': 'application/vnd.sdmx.data+json;version=1.0.0-wd',
+            'User-Agent': 'edu-pipeline/1.0'
+        })
+        
     def fetch_oecd_dataset(self, dataset: str, params: Optional[Dict] = None) -> pd.DataFrame:
         """
         Fetch data from OECD API
@@ -57,18 +113,20 @@ class OECDDataExtractor:
         
         try:
             logger.info(f"Fetching dataset: {dataset}")
-            response = requests.get(url, params=query_params, timeout=30)
-            response.raise_for_status()
-            
-            # Parse JSON response
-            data = response.json()
-            
-            # Extract data points
-            observations = data.get('dataSets', [{}])[0].get('observations', {})
-            dimensions = data.get('structure', {}).get('dimensions', {}).get('observation', [])
+            with self.session.get(url, params=query_params, timeout=self.timeout,
+                                  stream=True) as response:
+                response.raise_for_status()
+                
+                logger.debug(f"Response encoding for {dataset}: "
+                             f"{response.headers.get('Content-Encoding', 'identity')}")
+                
+                # Stream-parse the JSON body instead of loading it into a dict;
+                # decode_content makes the raw stream transparently gunzip
+                response.raw.decode_content = True
+                obs_keys, obs_values, dimensions = self._stream_oecd_json(response.raw)
             
             # Transform to DataFrame
-            df = self._parse_oecd_json(observations, dimensions)
+            df = self._parse_oecd_json(obs_keys, obs_values, dimensions)
             
             logger.info(f"Successfully fetched {len(df)} records for {dataset}")
             return df
@@ -76,36 +134,95 @@ class OECDDataExtractor:
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching {dataset}: {e}")
             raise
-        except (KeyError, IndexError) as e:
+        except (KeyError, IndexError, ijson.JSONError) as e:
             logger.error(f"Error parsing response for {dataset}: {e}")
             raise
     
-    def _parse_oecd_json(self, observations: Dict, dimensions: List) -> pd.DataFrame:
-        """Parse OECD JSON response into DataFrame"""
-        records = []
+    def _stream_oecd_json(self, stream) -> Tuple[List[str], List[float], List]:
+        """
+        Incrementally parse an SDMX-JSON stream
         
-        for obs_key, obs_value in observations.items():
-            # Parse observation key (dimension indices)
-            indices = [int(idx) for idx in obs_key.split(':')]
-            
-            record = {}
+        Collects the observation keys and first observation values of the
+        first data set along with the observation dimension metadata, in a
+        single pass and regardless of the order the sections appear in.
+        
+        Args:
+            stream: File-like object yielding the JSON response body
             
-            # Map dimensions to values
-            for i, dim in enumerate(dimensions):
-                if i < len(indices):
-                    idx = indices[i]
-                    if idx < len(dim['values']):
-                        dim_name = dim.get('name', f'dim_{i}')
-                        dim_value = dim['values'][idx].get('name', '')
-                        record[dim_name] = dim_value
+        Returns:
+            Tuple of (observation keys, observation values, dimensions)
+        """
+        obs_prefix = 'dataSets.item.observations'
+        dim_prefix = 'structure.dimensions.observation'
+        
+        obs_keys, obs_values = [], []
+        dimensions = []
+        dim_builder = None
+        first_dataset_done = False
+        value_pending = False
+        
+        for prefix, event, value in ijson.parse(stream, use_float=True):
+            if prefix.startswith(obs_prefix):
+                if first_dataset_done:
+                    continue
+                if prefix == obs_prefix and event == 'map_key':
+                    obs_keys.append(value)
+                    obs_values.append(np.nan)
+                    value_pending = True
+                elif value_pending and event == 'end_array':
+                    value_pending = False
+                elif (value_pending and prefix.endswith('.item')
+                      and event in ('number', 'string', 'null')):
+                    # The first array element is the observation value
+                    if value is not None:
+                        obs_values[-1] = value
+                    value_pending = False
             
-            # Add observation value
-            if obs_value:
-                record['value'] = obs_value[0]
+            elif prefix == 'dataSets.item' and event == 'end_map':
+                first_dataset_done = True
             
-            records.append(record)
+            elif prefix.startswith(dim_prefix):
+                if prefix == dim_prefix and event == 'start_array':
+                    dim_builder = ijson.ObjectBuilder()
+                if dim_builder is not None:
+                    dim_builder.event(event, value)
+                    if prefix == dim_prefix and event == 'end_array':
+                        dimensions = dim_builder.value
+                        dim_builder = None
+        
+        return obs_keys, obs_values, dimensions
+    
+    def _parse_oecd_json(self, obs_keys: List[str], obs_values: List[float],
+                         dimensions: List) -> pd.DataFrame:
+        """Parse OECD observations into DataFrame"""
+        if not obs_keys:
+            return pd.DataFrame()
+        
+        # Parse observation keys (dimension indices) into an (n_obs, n_dims)
+        # matrix; missing dimensions keep an out-of-range sentinel
+        n_obs = len(obs_keys)
+        buf = np.frombuffer(''.join(obs_keys).encode('ascii'), dtype=np.uint8)
+        offsets = np.zeros(n_obs + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, obs_keys), dtype=np.int64, count=n_obs),
+                  out=offsets[1:])
+        idx_matrix = np.full((n_obs, obs_keys[0].count(':') + 1),
+                             np.iinfo(np.int32).max, dtype=np.int32)
+        _parse_obs_keys(buf, offsets, idx_matrix)
+        
+        columns = {}
         
-        return pd.DataFrame(records)
+        # Map dimensions to values via per-dimension lookup arrays; the
+        # trailing NaN entry absorbs indices outside the dimension's values
+        for i, dim in enumerate(dimensions[:idx_matrix.shape[1]]):
+            names = [value.get('name', '') for value in dim['values']]
+            lookup = np.array(names + [np.nan], dtype=object)
+            dim_name = dim.get('name', f'dim_{i}')
+            columns[dim_name] = lookup[np.minimum(idx_matrix[:, i], len(names))]
+        
+        # Add observation values
+        columns['value'] = np.asarray(obs_values, dtype=np.float64)
+        
+        return pd.DataFrame(columns)
     
     def extract_enrollment_data(self) -> pd.DataFrame:
         """Extract enrollment rate data"""
@@ -139,34 +256,43 @@ class OECDDataExtractor:
         """Extract all education datasets"""
         logger.info("Starting extraction of all education datasets")
         
+        extractors = {
+            'enrollment': self.extract_enrollment_data,
+            'graduation': self.extract_graduation_data,
+            'spending': self.extract_spending_data
+        }
+        
         datasets = {}
         
         try:
-            datasets['enrollment'] = self.extract_enrollment_data()
-            time.sleep(1)  # Be polite to the API
-            
-            datasets['graduation'] = self.extract_graduation_data()
-            time.sleep(1)
-            
-            datasets['spending'] = self.extract_spending_data()
+            # Datasets are independent and I/O-bound, so fetch them concurrently
+            with ThreadPoolExecutor(max_workers=len(extractors)) as executor:
+                futures = {executor.submit(extract): name
+                           for name, extract in extractors.items()}
+                
+                for future in as_completed(futures):
+                    datasets[futures[future]] = future.result()
             
             logger.info("Successfully extracted all datasets")
-            return datasets
+            return {name: datasets[name] for name in extractors}
             
         except Exception as e:
             logger.error(f"Error in extraction: {e}")
             raise
     
     def save_raw_data(self, data_dict: Dict[str, pd.DataFrame], output_dir: str = "data/raw"):
-        """Save raw extracted data to CSV files"""
+        """Save raw extracted data to Parquet (or CSV) files"""
         import os
         os.makedirs(output_dir, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         for name, df in data_dict.items():
-            filename = f"{output_dir}/{name}_{timestamp}.csv"
-            df.to_csv(filename, index=False)
+            filename = f"{output_dir}/{name}_{timestamp}.{self.file_format}"
+            if self.file_format == 'csv':
+                df.to_csv(filename, index=False)
+            else:
+                df.to_parquet(filename, engine='pyarrow', compression='zstd', index=False)
             logger.info(f"Saved {len(df)} records to {filename}")
         
         # Save metadata
@@ -177,8 +303,8 @@ class OECDDataExtractor:
         }
         
         metadata_file = f"{output_dir}/metadata_{timestamp}.json"
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        with open(metadata_file, 'wb') as f:
+            f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
 
 def main():
     """Main extraction function"""
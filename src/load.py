@@ -5,35 +5,79 @@ Loads cleaned education data into SQLite database
 """
 import pandas as pd
 import sqlite3
-from sqlalchemy import create_engine, Table, Column, Integer, String, Float, Date, MetaData
+from sqlalchemy import create_engine, event, text, Connection, Table, Column, Integer, String, Float, Date, MetaData
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
+from contextlib import contextmanager
+import functools
 import logging
 from typing import Dict, List, Optional
 import yaml
 import os
 
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=16)
+def _parse_config(path: str, mtime: float, size: int) -> Dict:
+    """Parse a YAML config file; mtime and size key the cache so edits are picked up"""
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=_SafeLoader)
+
+def _load_config(path: str) -> Dict:
+    """Load a YAML config file, reusing the parsed result while it is unchanged"""
+    st = os.stat(path)
+    return _parse_config(path, st.st_mtime, st.st_size)
+
 class EducationDataLoader:
     """Loads education data into SQLite database"""
     
     def __init__(self, config_path: str = "config.yaml"):
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        self.config = _load_config(config_path)
         
         self.db_path = self.config['database']['sqlite_path']
         self.tables = self.config['database']['tables']
         
+        # Load date stamped on every row; refreshed at the start of each pipeline run
+        self._today = datetime.now().date()
+        
+        # Row counts per table, dropped whenever that table is loaded
+        self._stats_cache = {}
+        
         # Create database directory if it doesn't exist
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
         # Initialize database connection
         self.engine = create_engine(f"sqlite:///{self.db_path}")
+        event.listen(self.engine, "connect", self._set_sqlite_pragmas)
         self.metadata = MetaData()
         
         # Define table schemas
         self._define_schemas()
+        
+        # Country upsert statement, built once and reused from SQLAlchemy's compiled cache
+        upsert = insert(self.country_table)
+        self._country_upsert = upsert.on_conflict_do_update(
+            index_elements=['country_code'],
+            set_={col.name: upsert.excluded[col.name] for col in self.country_table.c
+                  if col.name not in ('id', 'country_code')}
+        )
+    
+    @staticmethod
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Apply write-oriented SQLite pragmas to each new connection"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.execute("PRAGMA mmap_size=10737418240")
+        cursor.close()
     
     def _define_schemas(self):
         """Define database table schemas"""
@@ -50,7 +94,7 @@ class EducationDataLoader:
             Column('gender', String(10)),
             Column('data_source', String(50)),
             Column('extraction_date', Date),
-            Column('created_at', Date, default=datetime.now().date())
+            Column('created_at', Date, default=lambda: datetime.now().date())
         )
         
         # Graduation table
@@ -66,7 +110,7 @@ class EducationDataLoader:
             Column('education_level', String(50)),
             Column('data_source', String(50)),
             Column('extraction_date', Date),
-            Column('created_at', Date, default=datetime.now().date())
+            Column('created_at', Date, default=lambda: datetime.now().date())
         )
         
         # Spending table
@@ -83,7 +127,7 @@ class EducationDataLoader:
             Column('currency', String(3)),
             Column('data_source', String(50)),
             Column('extraction_date', Date),
-            Column('created_at', Date, default=datetime.now().date())
+            Column('created_at', Date, default=lambda: datetime.now().date())
         )
         
         # Country metadata table
@@ -99,7 +143,7 @@ class EducationDataLoader:
             Column('gdp_per_capita', Float),
             Column('data_available', Integer),
             Column('last_updated', Date),
-            Column('created_at', Date, default=datetime.now().date())
+            Column('created_at', Date, default=lambda: datetime.now().date())
         )
     
     def create_tables(self):
@@ -111,9 +155,36 @@ class EducationDataLoader:
             logger.error(f"Error creating tables: {e}")
             raise
     
-    def load_enrollment_data(self, df: pd.DataFrame):
+    @contextmanager
+    def _begin(self, conn: Optional[Connection] = None):
+        """Yield the given connection, or a new one wrapped in its own transaction"""
+        if conn is not None:
+            yield conn
+        else:
+            with self.engine.begin() as new_conn:
+                yield new_conn
+    
+    def _bulk_insert_raw(self, table: Table, df: pd.DataFrame, conn: Connection):
+        """
+        Insert DataFrame rows with a single DBAPI executemany
+        
+        Bypasses SQLAlchemy statement compilation but runs on the DBAPI
+        connection behind conn, so the rows join its transaction. Only
+        columns that exist in the table schema are inserted.
+        """
+        columns = [col for col in df.columns if col in table.c]
+        query = (f"INSERT INTO {table.name} ({', '.join(columns)}) "
+                 f"VALUES ({', '.join('?' * len(columns))})")
+        
+        cursor = conn.connection.cursor()
+        try:
+            cursor.executemany(query, df[columns].itertuples(index=False, name=None))
+        finally:
+            cursor.close()
+    
+    def load_enrollment_data(self, df: pd.DataFrame, conn: Optional[Connection] = None):
         """Load enrollment data into database"""
-        logger.info(f"Loading enrollment data: {len(df)} records")
+        logger.info("Loading enrollment data: %d records", len(df))
         
         try:
             # Prepare DataFrame for database
@@ -139,25 +210,22 @@ class EducationDataLoader:
                     df_to_load[col] = 'Not Specified'
             
             # Add creation timestamp
-            df_to_load['created_at'] = datetime.now().date()
+            df_to_load['created_at'] = self._today
             
             # Load to database
-            df_to_load.to_sql(
-                self.tables['enrollment'],
-                self.engine,
-                if_exists='append',
-                index=False
-            )
+            with self._begin(conn) as tx:
+                self._bulk_insert_raw(self.enrollment_table, df_to_load, tx)
+            self._stats_cache.pop(self.tables['enrollment'], None)
             
-            logger.info(f"Successfully loaded {len(df_to_load)} enrollment records")
+            logger.info("Successfully loaded %d enrollment records", len(df_to_load))
             
         except Exception as e:
             logger.error(f"Error loading enrollment data: {e}")
             raise
     
-    def load_graduation_data(self, df: pd.DataFrame):
+    def load_graduation_data(self, df: pd.DataFrame, conn: Optional[Connection] = None):
         """Load graduation data into database"""
-        logger.info(f"Loading graduation data: {len(df)} records")
+        logger.info("Loading graduation data: %d records", len(df))
         
         try:
             df_to_load = df.copy()
@@ -178,24 +246,21 @@ class EducationDataLoader:
             if 'education_level' not in df_to_load.columns:
                 df_to_load['education_level'] = 'All Levels'
             
-            df_to_load['created_at'] = datetime.now().date()
+            df_to_load['created_at'] = self._today
             
-            df_to_load.to_sql(
-                self.tables['graduation'],
-                self.engine,
-                if_exists='append',
-                index=False
-            )
+            with self._begin(conn) as tx:
+                self._bulk_insert_raw(self.graduation_table, df_to_load, tx)
+            self._stats_cache.pop(self.tables['graduation'], None)
             
-            logger.info(f"Successfully loaded {len(df_to_load)} graduation records")
+            logger.info("Successfully loaded %d graduation records", len(df_to_load))
             
         except Exception as e:
             logger.error(f"Error loading graduation data: {e}")
             raise
     
-    def load_spending_data(self, df: pd.DataFrame):
+    def load_spending_data(self, df: pd.DataFrame, conn: Optional[Connection] = None):
         """Load spending data into database"""
-        logger.info(f"Loading spending data: {len(df)} records")
+        logger.info("Loading spending data: %d records", len(df))
         
         try:
             df_to_load = df.copy()
@@ -219,24 +284,21 @@ class EducationDataLoader:
                 # Placeholder calculation - would need actual GDP data
                 df_to_load['spending_percent_gdp'] = None
             
-            df_to_load['created_at'] = datetime.now().date()
+            df_to_load['created_at'] = self._today
             
-            df_to_load.to_sql(
-                self.tables['spending'],
-                self.engine,
-                if_exists='append',
-                index=False
-            )
+            with self._begin(conn) as tx:
+                self._bulk_insert_raw(self.spending_table, df_to_load, tx)
+            self._stats_cache.pop(self.tables['spending'], None)
             
-            logger.info(f"Successfully loaded {len(df_to_load)} spending records")
+            logger.info("Successfully loaded %d spending records", len(df_to_load))
             
         except Exception as e:
             logger.error(f"Error loading spending data: {e}")
             raise
     
-    def load_country_metadata(self, df: pd.DataFrame):
+    def load_country_metadata(self, df: pd.DataFrame, conn: Optional[Connection] = None):
         """Load country metadata into database"""
-        logger.info(f"Loading country metadata: {len(df)} records")
+        logger.info("Loading country metadata: %d records", len(df))
         
         try:
             df_to_load = df.copy()
@@ -258,49 +320,85 @@ class EducationDataLoader:
                 if col not in df_to_load.columns:
                     df_to_load[col] = None
             
-            df_to_load['created_at'] = datetime.now().date()
+            df_to_load['created_at'] = self._today
             
-            # Use SQLAlchemy to handle duplicates
-            from sqlalchemy.dialects.sqlite import insert
+            # Use the prebuilt upsert to handle duplicates with a single executemany
+            columns = [col for col in df_to_load.columns if col in self.country_table.c]
             
-            conn = self.engine.connect()
+            with self._begin(conn) as tx:
+                tx.execute(self._country_upsert, df_to_load[columns].to_dict(orient='records'))
+            self._stats_cache.pop(self.tables['countries'], None)
             
-            for _, row in df_to_load.iterrows():
-                stmt = insert(self.country_table).values(**row.to_dict())
-                stmt = stmt.on_conflict_do_update(
-                    index_elements=['country_code'],
-                    set_=row.to_dict()
-                )
-                conn.execute(stmt)
-            
-            conn.close()
-            
-            logger.info(f"Successfully loaded/updated {len(df_to_load)} country records")
+            logger.info("Successfully loaded/updated %d country records", len(df_to_load))
             
         except Exception as e:
             logger.error(f"Error loading country metadata: {e}")
             raise
     
+    def refresh_aggregates(self, conn: Optional[Connection] = None):
+        """Rebuild precomputed aggregate tables and indexes used by the dashboard"""
+        logger.info("Refreshing aggregate tables")
+        
+        enrollment = self.tables['enrollment']
+        trends = self.tables['enrollment_trends']
+        
+        statements = [
+            f"DROP TABLE IF EXISTS {trends}",
+            f"""
+            CREATE TABLE {trends} AS
+            SELECT 
+                year,
+                country_code,
+                country_name,
+                AVG(enrollment_rate) AS avg_enrollment,
+                COUNT(*) AS data_points
+            FROM {enrollment}
+            GROUP BY year, country_code, country_name
+            """,
+            f"CREATE INDEX ix_{trends}_country_code ON {trends} (country_code)",
+            f"CREATE INDEX IF NOT EXISTS ix_{self.tables['graduation']}_year "
+            f"ON {self.tables['graduation']} (year)",
+            f"CREATE INDEX IF NOT EXISTS ix_{self.tables['spending']}_year "
+            f"ON {self.tables['spending']} (year)"
+        ]
+        
+        try:
+            with self._begin(conn) as tx:
+                for statement in statements:
+                    tx.execute(text(statement))
+            
+            logger.info("Refreshed aggregate table %s", trends)
+            
+        except SQLAlchemyError as e:
+            logger.error(f"Error refreshing aggregates: {e}")
+            raise
+    
     def run_etl_pipeline(self, data_dict: Dict[str, pd.DataFrame]):
         """Run complete ETL pipeline"""
         logger.info("Starting ETL pipeline")
+        self._today = datetime.now().date()
         
         try:
             # Create tables if they don't exist
             self.create_tables()
             
-            # Load data in correct order (metadata first)
-            if 'countries' in data_dict:
-                self.load_country_metadata(data_dict['countries'])
-            
-            if 'enrollment' in data_dict:
-                self.load_enrollment_data(data_dict['enrollment'])
-            
-            if 'graduation' in data_dict:
-                self.load_graduation_data(data_dict['graduation'])
-            
-            if 'spending' in data_dict:
-                self.load_spending_data(data_dict['spending'])
+            # Load everything over one connection in a single transaction
+            with self.engine.begin() as conn:
+                # Load data in correct order (metadata first)
+                if 'countries' in data_dict:
+                    self.load_country_metadata(data_dict['countries'], conn)
+                
+                if 'enrollment' in data_dict:
+                    self.load_enrollment_data(data_dict['enrollment'], conn)
+                
+                if 'graduation' in data_dict:
+                    self.load_graduation_data(data_dict['graduation'], conn)
+                
+                if 'spending' in data_dict:
+                    self.load_spending_data(data_dict['spending'], conn)
+                
+                # Precompute dashboard aggregates from the freshly loaded data
+                self.refresh_aggregates(conn)
             
             logger.info("ETL pipeline completed successfully")
             
@@ -319,21 +417,29 @@ class EducationDataLoader:
             raise
     
     def get_table_stats(self) -> Dict:
-        """Get statistics about database tables"""
-        stats = {}
-        
+        """Get statistics about database tables, reusing counts until a table is reloaded"""
         tables = [self.tables['enrollment'], self.tables['graduation'], 
                   self.tables['spending'], self.tables['countries']]
         
-        for table in tables:
+        missing = [table for table in tables if table not in self._stats_cache]
+        if missing:
+            # Count all uncached tables in one round trip
+            query = " UNION ALL ".join(
+                f"SELECT '{table}' AS table_name, COUNT(*) AS count FROM {table}" for table in missing
+            )
             try:
-                query = f"SELECT COUNT(*) as count FROM {table}"
                 df = self.query_database(query)
-                stats[table] = df['count'].iloc[0]
+                self._stats_cache.update(zip(df['table_name'], df['count']))
             except:
-                stats[table] = 0
+                # Fall back to per-table counts so one missing table doesn't zero the rest
+                for table in missing:
+                    try:
+                        df = self.query_database(f"SELECT COUNT(*) as count FROM {table}")
+                        self._stats_cache[table] = df['count'].iloc[0]
+                    except:
+                        pass
         
-        return stats
+        return {table: self._stats_cache.get(table, 0) for table in tables}
 
 def main():
     """Main loading function"""
@@ -386,7 +492,7 @@ def main():
         
         # Show statistics
         stats = loader.get_table_stats()
-        logger.info(f"Database statistics: {stats}")
+        logger.info("Database statistics: %s", stats)
         
         logger.info("Loading completed successfully")
         
@@ -6,124 +6,237 @@ Cleans and transforms raw education data
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from types import MappingProxyType
+import functools
 import logging
 from typing import Dict, List, Optional
 import yaml
 import re
+import os
+
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
 
 logger = logging.getLogger(__name__)
 
+# Column name standardization patterns and common mappings
+_NONWORD_RE = re.compile(r'[^\w]')
+_MULTI_UNDERSCORE_RE = re.compile(r'_+')
+_COLUMN_MAPPINGS = MappingProxyType({
+    'time_period': 'year',
+    'ref_area': 'country',
+    'obs_value': 'value',
+    'location': 'country_code'
+})
+
+@functools.lru_cache(maxsize=16)
+def _parse_config(path: str, mtime: float, size: int) -> Dict:
+    """Parse a YAML config file; mtime and size key the cache so edits are picked up"""
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=_SafeLoader)
+
+def _load_config(path: str) -> Dict:
+    """Load a YAML config file, reusing the parsed result while it is unchanged"""
+    st = os.stat(path)
+    return _parse_config(path, st.st_mtime, st.st_size)
+
 class EducationDataTransformer:
     """Transforms and cleans education data"""
     
+    # OECD country codes to country names
+    _COUNTRY_MAP = {
+        'USA': 'United States',
+        'GBR': 'United Kingdom',
+        'DEU': 'Germany',
+        'FRA': 'France',
+        'JPN': 'Japan',
+        'CAN': 'Canada',
+        'AUS': 'Australia',
+        'OECD': 'OECD Average',
+        'EU': 'European Union'
+    }
+    
+    # Country codes to regions (simplified)
+    _REGION_MAP = {
+        'USA': 'North America',
+        'CAN': 'North America',
+        'GBR': 'Europe',
+        'DEU': 'Europe',
+        'FRA': 'Europe',
+        'ITA': 'Europe',
+        'ESP': 'Europe',
+        'JPN': 'Asia',
+        'AUS': 'Oceania'
+    }
+    
+    # Country codes to income groups (simplified)
+    _INCOME_MAP = dict.fromkeys(
+        ['USA', 'GBR', 'DEU', 'FRA', 'JPN', 'CAN', 'AUS', 'OECD'], 'High Income'
+    )
+    
+    # Per-dataset cleaning rules for _clean_generic
+    _CLEAN_SPECS = {
+        'enrollment': {
+            'indicator_pat': 'ENRL',
+            'value_col': 'enrollment_rate',
+            'value_range': (0, 200)
+        },
+        'graduation': {
+            'indicator_pat': 'GRAD',
+            'value_col': 'graduation_rate',
+            'value_range': (0, 120),
+            'derived': {'completion_rate': lambda rate: rate / 100}
+        },
+        'spending': {
+            'indicator_pat': 'FIN',
+            'value_col': 'spending_usd',
+            # Remove extreme outliers
+            'value_range': lambda usd: (usd.quantile(0.01), usd.quantile(0.99)),
+            # Per capita spending would need actual population data - placeholder
+            'derived': {'spending_per_capita': lambda usd: usd},
+            'constants': {'currency': 'USD'}
+        }
+    }
+    
+    # Low-cardinality columns of the cleaned datasets
+    _CATEGORICAL_COLUMNS = ('country_code', 'country_name', 'education_level',
+                            'gender', 'currency', 'data_source')
+    
     def __init__(self, config_path: str = "config.yaml"):
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        self.config = _load_config(config_path)
+        self.file_format = self.config.get('pipeline', {}).get('file_format', 'parquet')
+        
+        # Extraction date stamped on every cleaned row
+        self._today = datetime.now().date()
     
     def clean_enrollment_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Clean enrollment rate data"""
-        logger.info("Cleaning enrollment data")
-        
-        # Make a copy
-        df_clean = df.copy()
-        
-        # Standardize column names
-        df_clean.columns = [self._standardize_col_name(col) for col in df_clean.columns]
-        
-        # Filter relevant dimensions
-        if 'indicator' in df_clean.columns:
-            df_clean = df_clean[df_clean['indicator'].str.contains('ENRL', na=False)]
-        
-        # Clean country codes
-        if 'location' in df_clean.columns:
-            df_clean['country_code'] = df_clean['location'].str[:3]
-            df_clean['country_name'] = df_clean['location'].apply(self._map_country_code)
-        
-        # Clean year column
-        if 'time' in df_clean.columns:
-            df_clean['year'] = pd.to_numeric(df_clean['time'], errors='coerce')
-            df_clean = df_clean[df_clean['year'].between(2000, 2023)]
-        
-        # Clean values
-        if 'value' in df_clean.columns:
-            df_clean['enrollment_rate'] = pd.to_numeric(df_clean['value'], errors='coerce')
-            # Remove outliers
-            df_clean = df_clean[df_clean['enrollment_rate'].between(0, 200)]
-        
-        # Add metadata
-        df_clean['data_source'] = 'OECD'
-        df_clean['extraction_date'] = datetime.now().date()
-        
-        logger.info(f"Cleaned enrollment data: {len(df_clean)} records")
-        return df_clean
+        return self._clean_generic(self._standardize_columns(df), 'enrollment',
+                                   **self._CLEAN_SPECS['enrollment'])
     
     def clean_graduation_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Clean graduation rate data"""
-        logger.info("Cleaning graduation data")
-        
-        df_clean = df.copy()
-        df_clean.columns = [self._standardize_col_name(col) for col in df_clean.columns]
-        
-        if 'indicator' in df_clean.columns:
-            df_clean = df_clean[df_clean['indicator'].str.contains('GRAD', na=False)]
-        
-        if 'location' in df_clean.columns:
-            df_clean['country_code'] = df_clean['location'].str[:3]
-            df_clean['country_name'] = df_clean['location'].apply(self._map_country_code)
-        
-        if 'time' in df_clean.columns:
-            df_clean['year'] = pd.to_numeric(df_clean['time'], errors='coerce')
-            df_clean = df_clean[df_clean['year'].between(2000, 2023)]
-        
-        if 'value' in df_clean.columns:
-            df_clean['graduation_rate'] = pd.to_numeric(df_clean['value'], errors='coerce')
-            df_clean = df_clean[df_clean['graduation_rate'].between(0, 120)]
-        
-        # Calculate completion rates
-        if 'graduation_rate' in df_clean.columns:
-            df_clean['completion_rate'] = df_clean['graduation_rate'] / 100
-        
-        df_clean['data_source'] = 'OECD'
-        df_clean['extraction_date'] = datetime.now().date()
-        
-        logger.info(f"Cleaned graduation data: {len(df_clean)} records")
-        return df_clean
+        return self._clean_generic(self._standardize_columns(df), 'graduation',
+                                   **self._CLEAN_SPECS['graduation'])
     
     def clean_spending_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Clean education spending data"""
-        logger.info("Cleaning spending data")
+        return self._clean_generic(self._standardize_columns(df), 'spending',
+                                   **self._CLEAN_SPECS['spending'])
+    
+    def clean_all(self, dfs: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """
+        Clean several datasets at once
+        
+        Column names are standardized once per distinct raw schema and shared
+        between datasets that have the same columns.
+        
+        Args:
+            dfs: Raw datasets keyed by name ('enrollment', 'graduation', 'spending')
+            
+        Returns:
+            Cleaned datasets keyed by name; unknown names are skipped
+        """
+        standardized_columns = {}
+        cleaned = {}
+        
+        for name, df in dfs.items():
+            if name not in self._CLEAN_SPECS:
+                logger.warning(f"No cleaning rules for dataset: {name}")
+                continue
+            
+            schema = tuple(df.columns)
+            if schema not in standardized_columns:
+                standardized_columns[schema] = [self._standardize_col_name(col) for col in schema]
+            
+            df_std = df.set_axis(standardized_columns[schema], axis=1, copy=False)
+            cleaned[name] = self._clean_generic(df_std, name, **self._CLEAN_SPECS[name])
         
-        df_clean = df.copy()
-        df_clean.columns = [self._standardize_col_name(col) for col in df_clean.columns]
+        return cleaned
+    
+    def _standardize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Standardize column names (shallow: new columns never touch the input frame)"""
+        return df.rename(columns=self._standardize_col_name, copy=False)
+    
+    def _clean_generic(self, df_clean: pd.DataFrame, name: str, *, indicator_pat: str,
+                       value_col: str, value_range, derived: Optional[Dict] = None,
+                       constants: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        Clean an OECD indicator dataset with standardized column names
+        
+        Args:
+            df_clean: Dataset with standardized column names
+            name: Dataset name used in log messages
+            indicator_pat: Substring identifying the dataset's indicators
+            value_col: Name of the cleaned numeric value column
+            value_range: (low, high) bounds for outlier removal, or a function
+                returning those bounds from the value column
+            derived: Columns computed from the value column, as name -> function
+            constants: Additional constant-valued columns
+            
+        Returns:
+            Cleaned DataFrame
+        """
+        logger.info(f"Cleaning {name} data")
         
+        # Filter relevant dimensions
         if 'indicator' in df_clean.columns:
-            df_clean = df_clean[df_clean['indicator'].str.contains('FIN', na=False)]
+            df_clean = df_clean[df_clean['indicator'].str.contains(indicator_pat, na=False, regex=False)]
         
+        # Clean country codes
         if 'location' in df_clean.columns:
-            df_clean['country_code'] = df_clean['location'].str[:3]
-            df_clean['country_name'] = df_clean['location'].apply(self._map_country_code)
-        
-        if 'time' in df_clean.columns:
+            # Derive codes and names once per distinct location, then broadcast;
+            # the trailing NaN slot is picked up by factorize's -1 for missing values
+            inverse, uniques = pd.factorize(df_clean['location'])
+            uniques = pd.Series(uniques, dtype=object)
+            codes = np.append(uniques.str[:3].to_numpy(dtype=object), np.nan)
+            names = np.append(uniques.map(self._COUNTRY_MAP).fillna(uniques).to_numpy(dtype=object), np.nan)
+            df_clean['country_code'] = codes[inverse]
+            df_clean['country_name'] = names[inverse]
+        
+        # Clean year and value columns
+        has_year = 'time' in df_clean.columns
+        has_value = 'value' in df_clean.columns
+        
+        conditions = []
+        if has_year:
             df_clean['year'] = pd.to_numeric(df_clean['time'], errors='coerce')
-            df_clean = df_clean[df_clean['year'].between(2000, 2023)]
-        
-        if 'value' in df_clean.columns:
-            df_clean['spending_usd'] = pd.to_numeric(df_clean['value'], errors='coerce')
-            # Remove extreme outliers
-            q_low = df_clean['spending_usd'].quantile(0.01)
-            q_high = df_clean['spending_usd'].quantile(0.99)
-            df_clean = df_clean[df_clean['spending_usd'].between(q_low, q_high)]
-        
-        # Calculate per capita spending if population data available
-        if 'spending_usd' in df_clean.columns:
-            # This would need actual population data - placeholder
-            df_clean['spending_per_capita'] = df_clean['spending_usd']
+            conditions.append('(year >= 2000) & (year <= 2023)')
+        
+        if has_value:
+            df_clean[value_col] = pd.to_numeric(df_clean['value'], errors='coerce')
+            if callable(value_range):
+                # Data-dependent bounds are computed over the in-window years only
+                values = df_clean[value_col]
+                if has_year:
+                    values = values[df_clean['year'].between(2000, 2023)]
+                low, high = value_range(values)
+            else:
+                low, high = value_range
+            conditions.append(f'({value_col} >= @low) & ({value_col} <= @high)')
+        
+        # Filter years and remove outliers with one fused numexpr mask
+        if conditions:
+            df_clean = df_clean[df_clean.eval(' & '.join(conditions), engine='numexpr')]
+        
+        if has_value:
+            for col, func in (derived or {}).items():
+                df_clean[col] = func(df_clean[value_col])
         
+        # Add metadata
         df_clean['data_source'] = 'OECD'
-        df_clean['extraction_date'] = datetime.now().date()
-        df_clean['currency'] = 'USD'
+        df_clean['extraction_date'] = self._today
+        for col, value in (constants or {}).items():
+            df_clean[col] = value
         
-        logger.info(f"Cleaned spending data: {len(df_clean)} records")
+        # Store low-cardinality string columns as integer-coded categoricals
+        for col in self._CATEGORICAL_COLUMNS:
+            if col in df_clean.columns:
+                df_clean[col] = df_clean[col].astype('category')
+        
+        logger.info(f"Cleaned {name} data: {len(df_clean)} records")
         return df_clean
     
     def _standardize_col_name(self, col_name: str) -> str:
@@ -133,106 +246,49 @@ class EducationDataTransformer:
         
         # Convert to lowercase, replace spaces with underscores
         col_name = col_name.lower().strip()
-        col_name = re.sub(r'[^\w]', '_', col_name)
-        col_name = re.sub(r'_+', '_', col_name)
-        
-        # Common mappings
-        mappings = {
-            'time_period': 'year',
-            'ref_area': 'country',
-            'obs_value': 'value',
-            'location': 'country_code'
-        }
-        
-        return mappings.get(col_name, col_name)
-    
-    def _map_country_code(self, code: str) -> str:
-        """Map OECD country codes to country names"""
-        country_map = {
-            'USA': 'United States',
-            'GBR': 'United Kingdom',
-            'DEU': 'Germany',
-            'FRA': 'France',
-            'JPN': 'Japan',
-            'CAN': 'Canada',
-            'AUS': 'Australia',
-            'OECD': 'OECD Average',
-            'EU': 'European Union'
-        }
+        col_name = _NONWORD_RE.sub('_', col_name)
+        col_name = _MULTI_UNDERSCORE_RE.sub('_', col_name)
         
-        if isinstance(code, str) and code in country_map:
-            return country_map[code]
-        return code
+        return _COLUMN_MAPPINGS.get(col_name, col_name)
     
     def create_country_metadata(self, dfs: List[pd.DataFrame]) -> pd.DataFrame:
         """Create country metadata table"""
         logger.info("Creating country metadata")
         
-        all_countries = set()
+        # Collect distinct country codes and names with a single hash-based unique()
+        columns = [df[col].to_numpy(dtype=object) for df in dfs
+                   for col in ('country_code', 'country_name') if col in df.columns]
+        all_countries = (pd.Series(np.concatenate(columns)).dropna().unique()
+                         if columns else np.array([], dtype=object))
         
-        for df in dfs:
-            if 'country_code' in df.columns:
-                all_countries.update(df['country_code'].unique())
-            if 'country_name' in df.columns:
-                all_countries.update(df['country_name'].unique())
+        countries = pd.Series(np.sort(all_countries.astype(str)), dtype=object)
+        countries = countries[countries.str.strip() != ''].reset_index(drop=True)
         
         # Create metadata DataFrame
-        metadata = []
-        for country in sorted(all_countries):
-            if pd.notna(country) and str(country).strip():
-                metadata.append({
-                    'country_code': str(country)[:3] if len(str(country)) <= 3 else '',
-                    'country_name': str(country),
-                    'region': self._get_region(str(country)),
-                    'income_group': self._get_income_group(str(country)),
-                    'data_available': True,
-                    'last_updated': datetime.now().date()
-                })
-        
-        df_metadata = pd.DataFrame(metadata)
+        df_metadata = pd.DataFrame({
+            'country_code': countries.where(countries.str.len() <= 3, ''),
+            'country_name': countries,
+            'region': countries.map(self._REGION_MAP).fillna('Other'),
+            'income_group': countries.map(self._INCOME_MAP).fillna('Not Specified'),
+            'data_available': True,
+            'last_updated': self._today
+        })
         logger.info(f"Created metadata for {len(df_metadata)} countries")
         return df_metadata
     
-    def _get_region(self, country: str) -> str:
-        """Get region for a country (simplified)"""
-        regions = {
-            'USA': 'North America',
-            'CAN': 'North America',
-            'GBR': 'Europe',
-            'DEU': 'Europe',
-            'FRA': 'Europe',
-            'JPN': 'Asia',
-            'AUS': 'Oceania'
-        }
-        
-        if country in regions:
-            return regions[country]
-        
-        # Check if it's a known European country
-        european_codes = ['DEU', 'FRA', 'GBR', 'ITA', 'ESP']
-        if country in european_codes:
-            return 'Europe'
-        
-        return 'Other'
-    
-    def _get_income_group(self, country: str) -> str:
-        """Get income group for a country (simplified)"""
-        high_income = ['USA', 'GBR', 'DEU', 'FRA', 'JPN', 'CAN', 'AUS', 'OECD']
-        
-        if country in high_income:
-            return 'High Income'
-        return 'Not Specified'
-    
     def save_clean_data(self, data_dict: Dict[str, pd.DataFrame], output_dir: str = "data/processed"):
-        """Save cleaned data to CSV files"""
+        """Save cleaned data to Parquet (or CSV) files"""
         import os
         os.makedirs(output_dir, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         for name, df in data_dict.items():
-            filename = f"{output_dir}/{name}_clean_{timestamp}.csv"
-            df.to_csv(filename, index=False)
+            filename = f"{output_dir}/{name}_clean_{timestamp}.{self.file_format}"
+            if self.file_format == 'csv':
+                df.to_csv(filename, index=False)
+            else:
+                df.to_parquet(filename, engine='pyarrow', compression='snappy', index=False)
             logger.info(f"Saved clean {name} data: {len(df)} records")
         
         return f"{output_dir}/clean_data_{timestamp}"
@@ -251,7 +307,7 @@ def main():
         # Check for raw data files
         raw_dir = "data/raw"
         if os.path.exists(raw_dir):
-            raw_files = [f for f in os.listdir(raw_dir) if f.endswith('.csv')]
+            raw_files = [f for f in os.listdir(raw_dir) if f.endswith(('.parquet', '.csv'))]
             
             if raw_files:
                 logger.info(f"Found {len(raw_files)} raw data files")